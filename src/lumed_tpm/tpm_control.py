@@ -1,11 +1,24 @@
 import logging
+import math
 from threading import Lock
 
 import numpy as np
 import pyvisa
 
+from lumed_tpm.tpm_units import CANONICAL_UNIT
+
 logger = logging.getLogger()
 
+# Queries used to read back every setting held by a profile, in the order they
+# are applied to the instrument
+SETTINGS_QUERIES = {
+    "wavelength": "sense:correction:wavelength?",
+    "unit": "power:dc:unit?",
+    "auto_range": "power:dc:range:auto?",
+    "range": "power:dc:range?",
+    "average_count": "sense:average:count?",
+}
+
 
 class Powermeter:
 
@@ -36,6 +49,17 @@ class Powermeter:
             except Exception as e:
                 logger.error(e)
 
+    def _safe_scpi_query_batch(self, messages: list[str]) -> list[str]:
+        """Sends several queries as a single compound SCPI command"""
+        answer = self._safe_scpi_query(";:".join(messages))
+        return [a.strip() for a in answer.split(";")]
+
+    def _safe_scpi_write_batch(self, messages: list[str]) -> None:
+        """Sends several commands as a single compound SCPI command"""
+        if not messages:
+            return
+        self._safe_scpi_write(";:".join(messages))
+
     def find_thorlabs_pm(self) -> dict:
         ressources = self._ressource_manager.list_resources("?*USB?*")
         ressources = [r for r in ressources if "INSTR" in r]
@@ -135,6 +159,23 @@ class Powermeter:
 
         return wavelength
 
+    def get_correction_wavelength_limits(self) -> list[int, int]:
+        """Reads the minimum and maximum correction wavelengths in a single round trip"""
+        try:
+            answers = self._safe_scpi_query_batch(
+                [
+                    "sense:correction:wavelength? minimum",
+                    "sense:correction:wavelength? maximum",
+                ]
+            )
+            minimum, maximum = [int(float(answer)) for answer in answers]
+        except Exception as e:
+            logger.error(e)
+            minimum = np.nan
+            maximum = np.nan
+
+        return minimum, maximum
+
     def get_auto_range(self) -> bool:
         try:
             answer = self._safe_scpi_query("power:dc:range:auto?")
@@ -174,6 +215,24 @@ class Powermeter:
 
         return power
 
+    def get_settings(self) -> dict:
+        """Reads every profile setting of the instrument in a single round trip"""
+        try:
+            answers = self._safe_scpi_query_batch(list(SETTINGS_QUERIES.values()))
+            wavelength, unit, auto_range, current_range, count = answers
+            settings = {
+                "wavelength": int(float(wavelength)),
+                "unit": unit,
+                "auto_range": bool(int(auto_range)),
+                "range": float(current_range),
+                "average_count": int(count),
+            }
+        except Exception as e:
+            logger.error(e)
+            settings = {}
+
+        return settings
+
     # Setters
 
     def set_average_count(self, count: int = 1) -> None:
@@ -209,6 +268,47 @@ class Powermeter:
 
         return unit
 
+    def apply_settings(self, settings: dict, current: dict = None) -> list[str]:
+        """Applies the settings differing from the instrument's current state.
+
+        The current state is read from the instrument unless it is given. The
+        changed settings are sent as a single compound command. The
+        instrument is always kept in the canonical unit, the profile's unit
+        only applies to the host-side display. Returns the list of commands
+        that were sent.
+        """
+        if current is None:
+            current = self.get_settings()
+        commands = []
+
+        def changed(key):
+            if key not in settings:
+                return False
+            if key not in current:
+                return True
+            if isinstance(settings[key], float) or isinstance(current[key], float):
+                return not math.isclose(settings[key], current[key], rel_tol=1e-6)
+            return settings[key] != current[key]
+
+        if changed("wavelength"):
+            commands.append(f"sense:correction:wavelength {settings['wavelength']}")
+        if current.get("unit") != CANONICAL_UNIT:
+            commands.append(f"power:dc:unit {CANONICAL_UNIT}")
+        if changed("auto_range"):
+            auto_range = "ON" if settings["auto_range"] else "OFF"
+            commands.append(f"power:dc:range:auto {auto_range}")
+        if not settings.get("auto_range", False) and changed("range"):
+            commands.append(f"power:dc:range {settings['range']}")
+        if changed("average_count"):
+            commands.append(f"sense:average:count {settings['average_count']}")
+
+        try:
+            self._safe_scpi_write_batch(commands)
+        except Exception as e:
+            logger.error(e)
+
+        return commands
+
 
 if __name__ == "__main__":
     pm_ = Powermeter()
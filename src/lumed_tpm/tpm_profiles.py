@@ -0,0 +1,87 @@
+import json
+import logging
+from pathlib import Path
+
+from lumed_tpm.tpm_units import CANONICAL_UNIT
+
+logger = logging.getLogger(__name__)
+
+PROFILES_DIR = Path.home() / "lumed_tpm/profiles"
+
+DEFAULT_PROFILE = "default"
+
+# Settings stored in a profile. The instrument always reads in the canonical
+# unit, display_unit is the unit powers are converted to host-side.
+PROFILE_KEYS = ("wavelength", "auto_range", "range", "average_count", "display_unit")
+
+
+def profiles_path(serial_number: str) -> Path:
+    """Returns the path of the profiles file of a sensor"""
+    return PROFILES_DIR / f"{serial_number or 'unknown'}.json"
+
+
+def make_profile(settings: dict) -> dict:
+    """Keeps only the settings stored in a profile"""
+    return {key: settings[key] for key in PROFILE_KEYS if key in settings}
+
+
+def load_profiles(serial_number: str, current_settings: dict) -> dict:
+    """Loads the named settings profiles of a sensor from disk.
+
+    If the sensor has no profiles yet, its default profile is made from its
+    current settings, so applying it does not change the instrument.
+    """
+    path = profiles_path(serial_number)
+    default_profiles = {
+        DEFAULT_PROFILE: make_profile(
+            dict(current_settings, display_unit=CANONICAL_UNIT)
+        )
+    }
+
+    if not path.exists():
+        if current_settings:
+            save_profiles(serial_number, default_profiles)
+        return default_profiles
+
+    try:
+        with open(path, "r", encoding="utf-8") as file:
+            profiles = json.load(file)
+    except Exception as e:
+        logger.error(e)
+        profiles = {}
+
+    if not isinstance(profiles, dict):
+        logger.error("invalid profiles file %s", path)
+        profiles = {}
+
+    profiles = {
+        name: settings
+        for name, settings in profiles.items()
+        if isinstance(settings, dict)
+    }
+
+    if not profiles:
+        profiles = default_profiles
+
+    return profiles
+
+
+def save_profiles(serial_number: str, profiles: dict) -> None:
+    """Writes the named settings profiles of a sensor to disk"""
+    path = profiles_path(serial_number)
+
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(profiles, file, indent=4)
+    except Exception as e:
+        logger.error(e)
+
+
+def save_profile(serial_number: str, name: str, settings: dict) -> dict:
+    """Adds or replaces a single profile of a sensor and returns all of its profiles"""
+    profiles = load_profiles(serial_number, settings)
+    profiles[name] = make_profile(settings)
+    save_profiles(serial_number, profiles)
+
+    return profiles
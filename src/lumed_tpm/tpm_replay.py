@@ -0,0 +1,310 @@
+import logging
+import sys
+from pathlib import Path
+from threading import Lock
+from time import perf_counter, sleep
+
+import numpy as np
+
+from lumed_tpm.tpm_units import CANONICAL_UNIT
+
+logger = logging.getLogger()
+
+# Speed factor for which samples are returned as fast as they are requested
+AS_FAST_AS_POSSIBLE = 0
+
+# Settings of the replay source when it is created
+REPLAY_SETTINGS = {
+    "wavelength": 635,
+    "unit": CANONICAL_UNIT,
+    "auto_range": True,
+    "range": 0.0,
+    "average_count": 1,
+}
+
+
+def save_trace(path, times, powers) -> None:
+    """Saves a power trace (times in s, powers in W) in the replay format.
+
+    Traces are stored as a (n, 2) float64 .npy array so they can be memory
+    mapped on replay.
+    """
+    trace = np.column_stack([np.asarray(times, float), np.asarray(powers, float)])
+    np.save(path, trace)
+
+
+class ReplayPowermeter:
+    """Plays back recorded power traces through the Powermeter interface.
+
+    Recordings are memory mapped, only the samples that are actually read are
+    loaded from disk. With a speed of 1 samples are returned in real time,
+    larger values accelerate the playback and AS_FAST_AS_POSSIBLE returns the
+    next sample on every read.
+    """
+
+    def __init__(self, recordings_dir=".", speed: float = 1, loop: bool = True):
+        if speed < 0:
+            raise ValueError(f"playback speed must not be negative, got {speed}")
+
+        self.recordings_dir = Path(recordings_dir)
+        self.speed: float = speed
+        self.loop: bool = loop
+        self.isconnected: bool = False
+        self._model: str = ""
+        self._serial_number: str = ""
+        self._firmware_version: str = ""
+        self._trace: np.ndarray | None = None
+        self._settings: dict = dict(REPLAY_SETTINGS)
+        self._start_time: float = 0.0
+        self._index: int = 0
+        self._period: float = 0.0
+        self._mutex: Lock = Lock()
+
+    # Basic methods
+
+    def find_thorlabs_pm(self) -> dict:
+        recordings = sorted(self.recordings_dir.glob("*.npy"))
+        return {str(r): f"Replay,{r.stem}" for r in recordings}
+
+    def connect(self, ressource: str) -> None:
+        try:
+            trace = np.load(ressource, mmap_mode="r")
+            if trace.ndim != 2 or trace.shape[1] != 2 or len(trace) == 0:
+                raise ValueError(f"{ressource} is not a (n, 2) power trace")
+            self._trace = trace
+            # median period of the first samples, reading the whole trace
+            # would defeat the memory mapping
+            head = np.asarray(trace[:1001, 0])
+            self._period = float(np.median(np.diff(head))) if len(head) > 1 else 0.0
+            self._index = 0
+            self._start_time = perf_counter()
+            self.isconnected = True
+            self._model, self._serial_number, _ = self.get_id()
+            self._firmware_version = Path(ressource).name
+        except Exception as e:
+            logger.error(e)
+            self.isconnected = False
+
+    def auto_connect(self):
+        try:
+            device = list(self.find_thorlabs_pm())[0]
+            logger.debug("attempting connection to %s", device)
+            self.connect(device)
+        except Exception as e:
+            logger.error(e)
+
+    def disconnect(self):
+        if not self.isconnected:
+            return
+
+        self._trace = None
+        self.isconnected = False
+
+    def restart(self) -> None:
+        """Restarts the playback from the first sample"""
+        with self._mutex:
+            self._index = 0
+            self._start_time = perf_counter()
+
+    def _current_index(self) -> int:
+        n_samples = len(self._trace)
+
+        if self.speed == AS_FAST_AS_POSSIBLE:
+            with self._mutex:
+                index = self._index
+                self._index += 1
+        else:
+            times = self._trace[:, 0]
+            elapsed = (perf_counter() - self._start_time) * self.speed
+            # the last sample lasts one sample period
+            duration = times[-1] - times[0] + self._period
+            if self.loop and duration > 0:
+                elapsed %= duration
+            elif elapsed >= duration:
+                return -1
+            index = int(np.searchsorted(times, times[0] + elapsed, side="right")) - 1
+
+        if self.loop:
+            return index % n_samples
+
+        return index if index < n_samples else -1
+
+    def iter_chunks(self, chunk_size: int = 1024, block: bool = True):
+        """Yields (times, powers) chunks from the current playback position.
+
+        Each call has its own cursor, so several consumers and get_power() all
+        see every sample. Chunks are paced at the playback speed, wrap around
+        when looping and stop at the end of the trace otherwise or when
+        disconnected. Without blocking, empty chunks are yielded while no new
+        sample is due, which suits polling from a GUI timer.
+        """
+        if self._trace is None:
+            logger.error("no trace loaded")
+            return
+
+        if self.speed == AS_FAST_AS_POSSIBLE:
+            yield from self._iter_fast_chunks(chunk_size)
+        else:
+            yield from self._iter_timed_chunks(chunk_size, block)
+
+    def _iter_fast_chunks(self, chunk_size: int):
+        with self._mutex:
+            cursor = self._index
+
+        while self._trace is not None:
+            n_samples = len(self._trace)
+            start = cursor % n_samples if self.loop else cursor
+            if start >= n_samples:
+                return
+
+            chunk = self._trace[start : start + chunk_size]
+            cursor = start + len(chunk)
+            yield chunk[:, 0], chunk[:, 1]
+
+    def _iter_timed_chunks(self, chunk_size: int, block: bool):
+        index = self._current_index()
+        if index < 0:
+            # a trace played once has already ended
+            return
+
+        # index of the last sample yielded
+        position = index - 1
+
+        while self._trace is not None:
+            n_samples = len(self._trace)
+            index = self._current_index()
+
+            if index < 0:
+                # end of a trace played once
+                if position + 1 < n_samples:
+                    chunk = self._trace[position + 1 :]
+                    yield chunk[:, 0], chunk[:, 1]
+                return
+
+            if index < position:
+                if self.loop:
+                    chunk = self._trace[position + 1 :]
+                    if len(chunk):
+                        yield chunk[:, 0], chunk[:, 1]
+                # wrapped around or restarted
+                position = -1
+
+            if index > position:
+                chunk = self._trace[position + 1 : index + 1]
+                position = index
+                yield chunk[:, 0], chunk[:, 1]
+            elif not block:
+                chunk = self._trace[:0]
+                yield chunk[:, 0], chunk[:, 1]
+
+            if block:
+                sleep(max(chunk_size * self._period / self.speed, 1e-3))
+
+    # Getters
+
+    def get_id(self) -> list[str, str, str]:
+        return "Replay", "REPLAY", ""
+
+    def get_settings(self) -> dict:
+        return dict(self._settings)
+
+    def get_average_count(self) -> int:
+        return self._settings["average_count"]
+
+    def get_correction_wavelength(self) -> int:
+        return self._settings["wavelength"]
+
+    def get_correction_wavelength_min(self) -> int:
+        return 0
+
+    def get_correction_wavelength_max(self) -> int:
+        return 100000
+
+    def get_correction_wavelength_limits(self) -> list[int, int]:
+        return (
+            self.get_correction_wavelength_min(),
+            self.get_correction_wavelength_max(),
+        )
+
+    def get_auto_range(self) -> bool:
+        return self._settings["auto_range"]
+
+    def get_range(self) -> float:
+        return self._settings["range"]
+
+    def get_power_unit(self) -> str:
+        return self._settings["unit"]
+
+    def get_power(self) -> float:
+        try:
+            index = self._current_index()
+            power = float(self._trace[index, 1]) if index >= 0 else np.nan
+        except Exception as e:
+            logger.error(e)
+            power = np.nan
+
+        return power
+
+    # Setters
+
+    def apply_settings(self, settings: dict, current: dict = None) -> list[str]:
+        changed = [
+            key
+            for key in ("wavelength", "auto_range", "range", "average_count")
+            if key in settings and settings[key] != self._settings[key]
+        ]
+        for key in changed:
+            self._settings[key] = settings[key]
+
+        return changed
+
+    def set_average_count(self, count: int = 1) -> None:
+        self._settings["average_count"] = count
+
+    def set_correction_wavelength(self, wavelength: int = 635) -> None:
+        self._settings["wavelength"] = wavelength
+
+    def set_auto_range(self, auto_range: bool = False) -> None:
+        self._settings["auto_range"] = auto_range
+
+    def set_range(self, upper: float) -> None:
+        self._settings["range"] = upper
+
+    def set_power_unit(self, unit: str = "W") -> str:
+        logger.warning("replayed traces are always in %s", CANONICAL_UNIT)
+        return CANONICAL_UNIT
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from PyQt5.QtWidgets import QApplication, QMainWindow
+
+    from lumed_tpm.tpm_widget import TLabPowermeterWidget, configure_logger
+
+    def playback_speed(value):
+        speed = float(value)
+        if speed < 0:
+            raise argparse.ArgumentTypeError(f"speed must not be negative, got {value}")
+        return speed
+
+    parser = argparse.ArgumentParser(description="Replay recorded power traces")
+    parser.add_argument("recordings_dir", help="directory containing .npy traces")
+    parser.add_argument(
+        "--speed",
+        type=playback_speed,
+        default=1,
+        help="playback speed, 0 for max speed",
+    )
+    args = parser.parse_args()
+
+    configure_logger()
+
+    app = QApplication(sys.argv)
+    window = QMainWindow()
+    window.show()
+
+    replay = ReplayPowermeter(args.recordings_dir, speed=args.speed)
+    window.setCentralWidget(TLabPowermeterWidget(powermeter=replay))
+
+    app.exec_()
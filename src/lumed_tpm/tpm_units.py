@@ -0,0 +1,44 @@
+import numpy as np
+
+# Unit in which the instrument is always read, every other unit is computed
+# host-side from it
+CANONICAL_UNIT = "W"
+
+UNITS = ("W", "mW", "dBm", "photons/s")
+
+PLANCK_CONSTANT = 6.62607015e-34  # J s
+SPEED_OF_LIGHT = 299792458.0  # m/s
+
+_UNIT_ALIASES = {unit.lower(): unit for unit in UNITS}
+
+
+def normalize_unit(unit: str) -> str:
+    """Returns the canonical spelling of a unit (e.g. "DBM" -> "dBm")"""
+    try:
+        return _UNIT_ALIASES[unit.strip().lower()]
+    except (AttributeError, KeyError):
+        raise ValueError(f"unsupported power unit {unit!r}, expected one of {UNITS}")
+
+
+def convert_power(power_w, unit: str, wavelength_nm: float = np.nan):
+    """Converts powers in W to the requested unit.
+
+    Works on scalars as well as sample arrays. The wavelength is only required
+    for photon flux, which is NaN for a missing or non-positive wavelength.
+    """
+    unit = normalize_unit(unit)
+    power_w = np.asarray(power_w, dtype=float)
+
+    if unit == "W":
+        converted = power_w
+    elif unit == "mW":
+        converted = power_w * 1e3
+    elif unit == "dBm":
+        with np.errstate(divide="ignore", invalid="ignore"):
+            converted = 10 * np.log10(power_w / 1e-3)
+    else:
+        wavelength_m = np.asarray(wavelength_nm, dtype=float) * 1e-9
+        wavelength_m = np.where(wavelength_m > 0, wavelength_m, np.nan)
+        converted = power_w * wavelength_m / (PLANCK_CONSTANT * SPEED_OF_LIGHT)
+
+    return converted[()] if converted.ndim == 0 else converted
@@ -1,13 +1,17 @@
 import logging
+import math
 import sys
 from pathlib import Path
-from time import strftime
+from time import perf_counter, strftime
 
 import pyqt5_fugueicons as fugue
 from PyQt5.QtCore import QTimer
-from PyQt5.QtWidgets import QApplication, QMainWindow, QWidget
+from PyQt5.QtWidgets import QApplication, QInputDialog, QMainWindow, QWidget
 
 from lumed_tpm.tpm_control import Powermeter
+from lumed_tpm.tpm_profiles import DEFAULT_PROFILE, load_profiles, save_profile
+from lumed_tpm.tpm_replay import ReplayPowermeter
+from lumed_tpm.tpm_units import CANONICAL_UNIT, UNITS, convert_power, normalize_unit
 from lumed_tpm.ui.tpm_ui import Ui_widgetTLabPowermeter
 
 logger = logging.getLogger(__name__)
@@ -17,6 +21,9 @@ LOG_PATH = LOGS_DIR / f"{strftime('%Y_%m_%d_%H_%M_%S')}.log"
 
 LASER_STATE = {0: "Idle", 1: "ON", 2: "Not connected"}
 
+# Interval between power reads of a continuous measurement on an instrument, ms
+MEASUREMENT_INTERVAL = 100
+
 LOG_FORMAT = (
     "%(asctime)s - %(levelname)s"
     "(%(filename)s:%(funcName)s)"
@@ -46,19 +53,28 @@ def configure_logger():
 
 
 class TLabPowermeterWidget(QWidget, Ui_widgetTLabPowermeter):
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, powermeter=None):
         super().__init__(parent)
         self.setupUi(self)
 
         # logger
         logger.info("Widget initialization")
 
-        self.powermeter: Powermeter = Powermeter()
+        self.powermeter: Powermeter = powermeter or Powermeter()
+        self.profiles: dict = {}
+        self.power_unit: str = CANONICAL_UNIT
+        self.last_power: float = float("nan")
+        self.correction_wavelength: float = float("nan")
+        self.instrument_unit_ok: bool = True
+        self.measurement_count: int = 0
+        self.measurement_start: float = 0.0
+        self.measurement_stream = None
 
         # UI setup
         self.setup_default_ui()
         self.connect_ui_signals()
         self.setup_update_timer()
+        self.setup_measurement_timer()
         self.update_ui()
         logger.info("Widget initialization complete")
 
@@ -80,15 +96,25 @@ class TLabPowermeterWidget(QWidget, Ui_widgetTLabPowermeter):
         self.doubleSpinBoxRange.valueChanged.connect(self.power_range_changed)
         self.spinBoxCounts.valueChanged.connect(self.average_count_changed)
         self.spinBoxWavelength.valueChanged.connect(self.set_correction_wavelength)
+        self.comboBoxProfile.currentIndexChanged.connect(self.profile_changed)
+        self.pushButtonSaveProfile.clicked.connect(self.save_current_profile)
 
         # Measurements
         self.pushButtonSingleMeasurement.clicked.connect(self.take_single_power)
+        self.pushButtonStartMeasurement.clicked.connect(self.start_measurement)
+        self.pushButtonStopMeasurement.clicked.connect(self.stop_measurement)
 
     def setup_update_timer(self):
         self.update_timer = QTimer()
         self.update_timer.setInterval(100)
         self.update_timer.timeout.connect(self.update_ui)
 
+    def setup_measurement_timer(self):
+        # powers are displayed on the update timer
+        self.measurement_timer = QTimer()
+        self.measurement_timer.setInterval(MEASUREMENT_INTERVAL)
+        self.measurement_timer.timeout.connect(self.acquire_power)
+
     def update_ui(self):
 
         isconnected = self.powermeter.isconnected
@@ -100,6 +126,11 @@ class TLabPowermeterWidget(QWidget, Ui_widgetTLabPowermeter):
         self.groupBoxMeasurements.setEnabled(isconnected)
         self.groupBoxDetail.setEnabled(isconnected)
 
+        ismeasuring = self.measurement_timer.isActive()
+        self.pushButtonStartMeasurement.setEnabled(not ismeasuring)
+        self.pushButtonSingleMeasurement.setEnabled(not ismeasuring)
+        self.pushButtonStopMeasurement.setEnabled(ismeasuring)
+
         if isconnected:
             try:
                 self.update_settings()
@@ -110,14 +141,25 @@ class TLabPowermeterWidget(QWidget, Ui_widgetTLabPowermeter):
                 self.disconnect_powermeter()
 
     def update_settings(self):
+        settings = self.powermeter.get_settings()
+        if not settings:
+            raise ValueError("could not read powermeter settings")
+
+        # powers are only converted host-side when the instrument reads in W
+        unit_ok = settings["unit"] == CANONICAL_UNIT
+        if not unit_ok and self.instrument_unit_ok:
+            logger.error(
+                "powermeter reads in %s instead of %s, powers are not displayed",
+                settings["unit"],
+                CANONICAL_UNIT,
+            )
+        self.instrument_unit_ok = unit_ok
 
-        if not self.comboBoxUnit.hasFocus():
-            unit = self.powermeter.get_power_unit()
-            index = {"W": 0, "DBM": 1}
-            self.comboBoxUnit.setCurrentIndex(index[unit])
-
+        # refreshing the widgets must not write the values back to the instrument
         if not self.pushButtonAutoRange.hasFocus():
-            self.pushButtonAutoRange.setChecked(self.powermeter.get_auto_range())
+            self.pushButtonAutoRange.blockSignals(True)
+            self.pushButtonAutoRange.setChecked(settings["auto_range"])
+            self.pushButtonAutoRange.blockSignals(False)
 
         if self.pushButtonAutoRange.isChecked():
             self.pushButtonAutoRange.setText("Enabled")
@@ -127,21 +169,31 @@ class TLabPowermeterWidget(QWidget, Ui_widgetTLabPowermeter):
             self.doubleSpinBoxRange.setEnabled(True)
 
         if not self.doubleSpinBoxRange.hasFocus():
-            current_range = float(self.powermeter.get_range())
-            if current_range != self.doubleSpinBoxRange.value():
-                self.doubleSpinBoxRange.setValue(current_range)
+            self.doubleSpinBoxRange.blockSignals(True)
+            self.doubleSpinBoxRange.setValue(settings["range"])
+            self.doubleSpinBoxRange.blockSignals(False)
 
         if not self.spinBoxCounts.hasFocus():
-            self.spinBoxCounts.setValue(self.powermeter.get_average_count())
+            self.spinBoxCounts.blockSignals(True)
+            self.spinBoxCounts.setValue(settings["average_count"])
+            self.spinBoxCounts.blockSignals(False)
 
+        self.correction_wavelength = settings["wavelength"]
         if not self.spinBoxWavelength.hasFocus():
-            self.spinBoxWavelength.setMinimum(
-                self.powermeter.get_correction_wavelength_min()
-            )
-            self.spinBoxWavelength.setMaximum(
-                self.powermeter.get_correction_wavelength_max()
-            )
-            self.spinBoxWavelength.setValue(self.powermeter.get_correction_wavelength())
+            self.spinBoxWavelength.blockSignals(True)
+            self.spinBoxWavelength.setValue(self.correction_wavelength)
+            self.spinBoxWavelength.blockSignals(False)
+
+    def update_wavelength_limits(self):
+        minimum, maximum = self.powermeter.get_correction_wavelength_limits()
+        if math.isnan(minimum) or math.isnan(maximum):
+            logger.error("could not read correction wavelength limits")
+            return
+
+        self.spinBoxWavelength.blockSignals(True)
+        self.spinBoxWavelength.setMinimum(minimum)
+        self.spinBoxWavelength.setMaximum(maximum)
+        self.spinBoxWavelength.blockSignals(False)
 
     def update_detail(self):
         self.lineEditModel.setText(self.powermeter._model)
@@ -149,7 +201,8 @@ class TLabPowermeterWidget(QWidget, Ui_widgetTLabPowermeter):
         self.lineEditFirmwareVersion.setText(self.powermeter._firmware_version)
 
     def update_measurements(self):
-        pass
+        if self.measurement_timer.isActive():
+            self.display_power()
 
     # Device
 
@@ -166,10 +219,15 @@ class TLabPowermeterWidget(QWidget, Ui_widgetTLabPowermeter):
         try:
             logger.info("connecting powermeter %s", device)
             self.powermeter.connect(device)
-            self.apply_default()
+            if not self.powermeter.isconnected:
+                logger.error("could not connect powermeter %s", device)
+                return
+            self.update_wavelength_limits()
+            settings = self.powermeter.get_settings()
+            self.update_profile_list(current_settings=settings)
+            self.apply_profile(current_settings=settings)
             self.update_ui()
             self.update_timer.start()
-            self.apply_default()
 
         except Exception as e:
             logger.error(e)
@@ -180,32 +238,91 @@ class TLabPowermeterWidget(QWidget, Ui_widgetTLabPowermeter):
             return
 
         logger.info("Disconnecting powermeter")
+        self.stop_measurement()
         self.powermeter.disconnect()
         self.update_timer.stop()
         self.update_ui()
 
-    def apply_default(self):
+    # Profiles
+
+    def update_profile_list(
+        self, selected: str = DEFAULT_PROFILE, current_settings=None
+    ):
+        if current_settings is None:
+            current_settings = self.powermeter.get_settings()
+        self.profiles = load_profiles(self.powermeter._serial_number, current_settings)
+
+        self.comboBoxProfile.blockSignals(True)
+        self.comboBoxProfile.clear()
+        self.comboBoxProfile.addItems(self.profiles)
+        if selected in self.profiles:
+            self.comboBoxProfile.setCurrentText(selected)
+        self.comboBoxProfile.blockSignals(False)
+
+    def profile_changed(self):
+        self.apply_profile()
+
+    def apply_profile(self, current_settings=None):
 
         if not self.powermeter.isconnected:
             logger.error("powermeter not connected")
             return
 
-        self.powermeter.set_correction_wavelength(785)
-        self.powermeter.set_power_unit("W")
-        self.powermeter.set_auto_range(False)
-        self.powermeter.set_range(200e-3)
-        self.powermeter.set_average_count(1)
-
-    # Settings
-    def unit_changed(self):
-        new_units = ["W", "DBM"][self.comboBoxUnit.currentIndex()]
+        name = self.comboBoxProfile.currentText()
+        settings = self.profiles.get(name)
+        if settings is None:
+            logger.error("unknown profile %s", name)
+            return
 
         try:
-            self.powermeter.set_power_unit(new_units)
-            logger.info("power units changed to %s", new_units)
+            commands = self.powermeter.apply_settings(settings, current_settings)
+            logger.info("profile %s applied (%s settings changed)", name, len(commands))
         except Exception as e:
             logger.error(e)
 
+        # the instrument now holds the profile's wavelength
+        if "wavelength" in settings:
+            self.correction_wavelength = settings["wavelength"]
+
+        try:
+            unit = normalize_unit(settings.get("display_unit", CANONICAL_UNIT))
+        except ValueError as e:
+            logger.error(e)
+            unit = CANONICAL_UNIT
+        self.comboBoxUnit.setCurrentIndex(UNITS.index(unit))
+
+    def save_current_profile(self):
+
+        if not self.powermeter.isconnected:
+            logger.error("powermeter not connected")
+            return
+
+        name, accepted = QInputDialog.getText(
+            self,
+            "Save Profile",
+            "Profile name",
+            text=self.comboBoxProfile.currentText(),
+        )
+        name = name.strip()
+        if not accepted or not name:
+            return
+
+        settings = self.powermeter.get_settings()
+        if not settings:
+            logger.error("could not read powermeter settings")
+            return
+        settings["display_unit"] = self.power_unit
+
+        save_profile(self.powermeter._serial_number, name, settings)
+        self.update_profile_list(selected=name, current_settings=settings)
+        logger.info("profile %s saved", name)
+
+    # Settings
+    def unit_changed(self):
+        self.power_unit = UNITS[self.comboBoxUnit.currentIndex()]
+        logger.info("power units changed to %s", self.power_unit)
+        self.display_power()
+
     def auto_range_toggled(self):
         autorange_enabled = self.pushButtonAutoRange.isChecked()
 
@@ -238,6 +355,7 @@ class TLabPowermeterWidget(QWidget, Ui_widgetTLabPowermeter):
 
         try:
             self.powermeter.set_correction_wavelength(wavelength)
+            self.correction_wavelength = wavelength
             logger.info("correction wavelength set to %s nm", wavelength)
         except Exception as e:
             logger.error(e)
@@ -245,11 +363,68 @@ class TLabPowermeterWidget(QWidget, Ui_widgetTLabPowermeter):
     # Measurements
 
     def take_single_power(self):
-        power = self.powermeter.get_power()
-        units = self.powermeter.get_power_unit()
+        self.last_power = self.powermeter.get_power()
+        self.display_power()
+
+    def start_measurement(self):
+        logger.info("starting continuous measurement")
+        self.measurement_count = 0
+        self.measurement_start = perf_counter()
+
+        if isinstance(self.powermeter, ReplayPowermeter):
+            # replayed samples are streamed as fast as the event loop allows
+            self.measurement_stream = self.powermeter.iter_chunks(block=False)
+            self.measurement_timer.setInterval(0)
+        else:
+            self.measurement_stream = None
+            self.measurement_timer.setInterval(MEASUREMENT_INTERVAL)
+
+        self.measurement_timer.start()
+        self.update_ui()
+
+    def stop_measurement(self):
+        if not self.measurement_timer.isActive():
+            return
+
+        self.measurement_timer.stop()
+        duration = perf_counter() - self.measurement_start
+        logger.info(
+            "continuous measurement stopped : %s powers in %.2f s (%.1f Hz)",
+            self.measurement_count,
+            duration,
+            self.measurement_count / duration if duration > 0 else 0,
+        )
+        self.measurement_stream = None
+
+    def acquire_power(self):
+        if self.measurement_stream is None:
+            self.last_power = self.powermeter.get_power()
+            self.measurement_count += 1
+            return
+
+        try:
+            _, powers = next(self.measurement_stream)
+        except StopIteration:
+            logger.info("end of replayed trace")
+            self.stop_measurement()
+            return
+
+        if len(powers):
+            self.last_power = float(powers[-1])
+            self.measurement_count += len(powers)
+
+    def display_power(self):
+        if not self.instrument_unit_ok:
+            self.lineEditPower.setText("invalid unit")
+            self.labelPowerUnits.setText("")
+            return
+
+        power = convert_power(
+            self.last_power, self.power_unit, self.correction_wavelength
+        )
 
         self.lineEditPower.setText(f"{power:.2e}")
-        self.labelPowerUnits.setText(units)
+        self.labelPowerUnits.setText(self.power_unit)
 
 
 if __name__ == "__main__":
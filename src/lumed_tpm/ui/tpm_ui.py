@@ -51,6 +51,8 @@ class Ui_widgetTLabPowermeter(object):
         self.comboBoxUnit.setObjectName("comboBoxUnit")
         self.comboBoxUnit.addItem("")
         self.comboBoxUnit.addItem("")
+        self.comboBoxUnit.addItem("")
+        self.comboBoxUnit.addItem("")
         self.gridLayout_4.addWidget(self.comboBoxUnit, 0, 1, 1, 1)
         self.label_9 = QtWidgets.QLabel(self.groupBoxSettings)
         self.label_9.setObjectName("label_9")
@@ -64,6 +66,15 @@ class Ui_widgetTLabPowermeter(object):
         self.spinBoxWavelength = QtWidgets.QSpinBox(self.groupBoxSettings)
         self.spinBoxWavelength.setObjectName("spinBoxWavelength")
         self.gridLayout_4.addWidget(self.spinBoxWavelength, 5, 1, 1, 1)
+        self.label_11 = QtWidgets.QLabel(self.groupBoxSettings)
+        self.label_11.setObjectName("label_11")
+        self.gridLayout_4.addWidget(self.label_11, 6, 0, 1, 1)
+        self.comboBoxProfile = QtWidgets.QComboBox(self.groupBoxSettings)
+        self.comboBoxProfile.setObjectName("comboBoxProfile")
+        self.gridLayout_4.addWidget(self.comboBoxProfile, 6, 1, 1, 1)
+        self.pushButtonSaveProfile = QtWidgets.QPushButton(self.groupBoxSettings)
+        self.pushButtonSaveProfile.setObjectName("pushButtonSaveProfile")
+        self.gridLayout_4.addWidget(self.pushButtonSaveProfile, 7, 0, 1, 2)
         self.gridLayout.addWidget(self.groupBoxSettings, 1, 0, 1, 1)
         self.groupBoxMeasurements = QtWidgets.QGroupBox(widgetTLabPowermeter)
         self.groupBoxMeasurements.setObjectName("groupBoxMeasurements")
@@ -174,9 +185,13 @@ class Ui_widgetTLabPowermeter(object):
         self.label_8.setText(_translate("widgetTLabPowermeter", "Counts "))
         self.label_4.setText(_translate("widgetTLabPowermeter", "Power Unit"))
         self.comboBoxUnit.setItemText(0, _translate("widgetTLabPowermeter", "W"))
-        self.comboBoxUnit.setItemText(1, _translate("widgetTLabPowermeter", "dBm"))
+        self.comboBoxUnit.setItemText(1, _translate("widgetTLabPowermeter", "mW"))
+        self.comboBoxUnit.setItemText(2, _translate("widgetTLabPowermeter", "dBm"))
+        self.comboBoxUnit.setItemText(3, _translate("widgetTLabPowermeter", "photons/s"))
         self.label_9.setText(_translate("widgetTLabPowermeter", "Automatic Range"))
         self.label_10.setText(_translate("widgetTLabPowermeter", "Wavelength"))
+        self.label_11.setText(_translate("widgetTLabPowermeter", "Profile"))
+        self.pushButtonSaveProfile.setText(_translate("widgetTLabPowermeter", "Save Profile"))
         self.groupBoxMeasurements.setTitle(_translate("widgetTLabPowermeter", "Measurements"))
         self.pushButtonStartMeasurement.setText(_translate("widgetTLabPowermeter", "Start"))
         self.label_7.setText(_translate("widgetTLabPowermeter", "Power"))